@@ -6,6 +6,7 @@ Pipeline:
 2. Compute basic features (log returns, volatility, drawdown)
 3. (Later) Label crisis periods and run analysis
 """
+import logging
 import sys
 import os
 
@@ -13,9 +14,12 @@ import os
 project_root = os.path.dirname(os.path.dirname(__file__))
 sys.path.append(project_root)
 
+# Keep the per-step [OK] messages from src modules visible on stdout
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
 
 from src.data_loader import load_indices, download_and_save_indices
-from src.features import compute_features
+from src.features import load_or_compute
 from src.crisis_windows import label_crisis_periods
 from src.analysis import run_analysis
 
@@ -41,7 +45,7 @@ def main(download: bool = False):
     print("Data loaded.\n")
 
     print("Step 3: computing features (returns, volatility, drawdown)...")
-    data_with_features = compute_features(raw_data)
+    data_with_features = load_or_compute(raw_data)
     print("Features computed.\n")
     print("Step 4: labeling crisis periods ...")
     labelled_data = label_crisis_periods(data_with_features)
@@ -3,14 +3,18 @@ Analysis utilities for the Financial Crises Project.
 
 This module:
 - computes summary statistics by regime (normal / pre_crisis / crisis / post_crisis)
-- saves CSV tables to results/
+- saves Parquet tables to results/ (CSV too when write_csv=True)
 - saves panel plots (price, volatility, drawdown) to results/
 """
 
 import os
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
 
-import matplotlib.pyplot as plt
+# The object-oriented Agg classes are used directly instead of pyplot:
+# no global figure registry to lock or clean up, so figure rendering is
+# thread-safe and PNG encoding releases the GIL while saving
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import pandas as pd
 
 
@@ -21,12 +25,13 @@ def _ensure_results_dir(out_dir: str) -> None:
 
 def regime_summary(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Compute summary statistics by regime for a single index.
+    Compute summary statistics by ticker and regime in one pass.
 
     Parameters
     ----------
     df : DataFrame
-        Must contain columns:
+        Long-format frame; must contain columns:
+        - 'ticker'
         - 'regime'
         - 'log_return'
         - 'vol_30d'
@@ -35,22 +40,53 @@ def regime_summary(df: pd.DataFrame) -> pd.DataFrame:
     Returns
     -------
     summary : DataFrame
-        Table with mean, std, min, max of each variable by regime.
+        Table with mean, std, min, max of each variable, indexed by
+        (ticker, regime).
     """
+    # ticker and regime arrive as Categoricals from the earlier stages;
+    # convert on the fly otherwise, so the groupby hashes int8 codes
+    # instead of Python strings before the vectorized reductions
+    for col in ("ticker", "regime"):
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df = df.assign(**{col: df[col].astype("category")})
+
     summary = (
-        df.groupby("regime")[["log_return", "vol_30d", "drawdown"]]
+        df.groupby(["ticker", "regime"], observed=True)[
+            ["log_return", "vol_30d", "drawdown"]
+        ]
         .agg(["mean", "std", "min", "max"])
     )
     return summary
 
 
+def _save_summary(summary: pd.DataFrame, path_base: str, write_csv: bool) -> str:
+    """
+    Save a summary table as Parquet (and optionally CSV).
+
+    Parquet is the default output: it keeps dtypes intact and writes far
+    faster than stringifying every float to CSV. The (variable, stat)
+    column MultiIndex is flattened to 'variable_stat' names because
+    Parquet does not support MultiIndex columns.
+    """
+    out = summary.copy()
+    out.columns = ["_".join(filter(None, map(str, col))) for col in out.columns]
+
+    parquet_path = f"{path_base}.parquet"
+    out.to_parquet(parquet_path)
+    if write_csv:
+        summary.to_csv(f"{path_base}.csv")
+    return parquet_path
+
+
 def plot_index_panels(df: pd.DataFrame, name: str, out_dir: str = "results") -> None:
     """
     Plot price, volatility and drawdown panels for a given index and save to file.
     """
     _ensure_results_dir(out_dir)
 
-    fig, axes = plt.subplots(3, 1, figsize=(14, 10), sharex=True)
+    fig = Figure(figsize=(14, 10))
+    canvas = FigureCanvasAgg(fig)
+    axes = fig.subplots(3, 1, sharex=True)
 
     # Price
     axes[0].plot(df.index, df["Close"])
@@ -71,50 +107,57 @@ def plot_index_panels(df: pd.DataFrame, name: str, out_dir: str = "results") ->
     fig.tight_layout()
 
     out_path = os.path.join(out_dir, f"{name}_panels.png")
-    fig.savefig(out_path)
-    plt.close(fig)
+    canvas.print_png(out_path)
+    # No plt.close needed: the figure is never registered with pyplot
 
     print(f"[OK] Saved plot for {name} to {out_path}")
 
 
-def run_analysis(labelled_data: Dict[str, pd.DataFrame], out_dir: str = "results") -> None:
+def run_analysis(
+    labelled_data: pd.DataFrame,
+    out_dir: str = "results",
+    write_csv: bool = False,
+) -> None:
     """
     Run the full analysis for all indices:
-    - save regime summary tables as CSV
+    - save regime summary tables as Parquet (plus CSV when write_csv=True)
     - save panel plots (price, volatility, drawdown)
 
     Parameters
     ----------
-    labelled_data : dict
-        Output of label_crisis_periods (dict of DataFrames, one per index).
+    labelled_data : DataFrame
+        Output of label_crisis_periods (long-format frame with a
+        categorical 'ticker' column).
     out_dir : str
         Directory where results will be stored.
+    write_csv : bool
+        Also write the summary tables as CSV (slower; for human reading).
     """
     _ensure_results_dir(out_dir)
 
-    all_summaries = []
+    # 1) One groupby pass over (ticker, regime) yields the combined
+    # summary; the per-index tables are slices of it
+    combined = regime_summary(labelled_data)
 
-    for name, df in labelled_data.items():
-        # 1) Save summary statistics by regime for this index
-        summary = regime_summary(df)
-        summary_path = os.path.join(out_dir, f"{name}_regime_summary.csv")
-        summary.to_csv(summary_path)
+    for name in combined.index.get_level_values("ticker").unique():
+        summary = combined.xs(name, level="ticker")
+        path_base = os.path.join(out_dir, f"{name}_regime_summary")
+        summary_path = _save_summary(summary, path_base, write_csv)
         print(f"[OK] Saved regime summary for {name} to {summary_path}")
 
-        # Keep a flattened version for a global summary
-        flat = summary.copy()
-        flat["index"] = name
-        all_summaries.append(flat)
-
-        # 2) Save plots
-        plot_index_panels(df, name, out_dir=out_dir)
-
-    # Optional: global summary across indices
-    if all_summaries:
-        combined = pd.concat(all_summaries)
-        combined_path = os.path.join(out_dir, "all_indices_regime_summary.csv")
-        combined.to_csv(combined_path)
-        print(f"[OK] Saved combined regime summary to {combined_path}")
+    combined_base = os.path.join(out_dir, "all_indices_regime_summary")
+    combined_path = _save_summary(combined, combined_base, write_csv)
+    print(f"[OK] Saved combined regime summary to {combined_path}")
+
+    # 2) Save plots concurrently: threads (not processes) avoid pickling
+    # each DataFrame to a worker, and Agg releases the GIL while encoding
+    groups = list(labelled_data.groupby("ticker", observed=True, sort=False))
+    with ThreadPoolExecutor(max_workers=len(groups)) as ex:
+        for _ in ex.map(
+            lambda kv: plot_index_panels(kv[1], kv[0], out_dir=out_dir),
+            groups,
+        ):
+            pass
 
     print("Analysis completed. All results saved in the 'results/' directory.")
 
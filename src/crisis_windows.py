@@ -2,9 +2,21 @@
 Definition and labelling of crisis windows.
 """
 
-from typing import Dict, List
+import logging
+from typing import List
+
+import numpy as np
 import pandas as pd
 
+# Same numba-or-identity decorator as the features module; the kernel
+# body is plain numpy, so it also runs un-jitted when numba is missing
+from src.features import njit
+
+logger = logging.getLogger(__name__)
+
+
+# Regime categories in code order (index = int8 code used while labelling)
+REGIME_LABELS = ["normal", "pre_crisis", "crisis", "post_crisis"]
 
 # List of major crises to study (you can adjust the dates later if needed)
 CRISES: List[dict] = [
@@ -31,18 +43,66 @@ CRISES: List[dict] = [
 ]
 
 
+def _parse_crises(pre_crisis_months: int, post_crisis_months: int) -> List[dict]:
+    """
+    Parse the crisis window bounds once, as np.datetime64 values ready
+    for searchsorted, so they are not rebuilt for every ticker.
+    """
+    crises_parsed = []
+    for c in CRISES:
+        start = pd.to_datetime(c["start"])
+        end = pd.to_datetime(c["end"])
+        crises_parsed.append(
+            {
+                "name": c["name"],
+                "start": start.to_datetime64(),
+                "end": end.to_datetime64(),
+                "pre_start": (start - pd.DateOffset(months=pre_crisis_months)).to_datetime64(),
+                "post_end": (end + pd.DateOffset(months=post_crisis_months)).to_datetime64(),
+            }
+        )
+    return crises_parsed
+
+
+@njit(cache=True)
+def _label_kernel(ts_ns, starts, ends, pre_starts, post_ends,
+                  regime_codes, crisis_name_codes, base):
+    """
+    Fill regime / crisis-name codes for one ticker block.
+
+    ts_ns is the block's sorted timestamps as int64 nanoseconds; the
+    crisis bounds come as parallel int64 arrays. Writes int8 codes into
+    the global output arrays starting at offset `base`. Pure numeric
+    work, so it JIT-compiles once and is reused for every ticker.
+    """
+    for k in range(starts.shape[0]):
+        # Slice bounds: [pre_start, start) / [start, end] / (end, post_end]
+        pre_lo = base + np.searchsorted(ts_ns, pre_starts[k], side="left")
+        lo = base + np.searchsorted(ts_ns, starts[k], side="left")
+        hi = base + np.searchsorted(ts_ns, ends[k], side="right")
+        post_hi = base + np.searchsorted(ts_ns, post_ends[k], side="right")
+
+        # Codes: 0=normal, 1=pre_crisis, 2=crisis, 3=post_crisis
+        regime_codes[lo:hi] = np.int8(2)
+        regime_codes[pre_lo:lo] = np.int8(1)
+        regime_codes[hi:post_hi] = np.int8(3)
+        crisis_name_codes[pre_lo:post_hi] = np.int8(k)
+
+
 def label_crisis_periods(
-    data: Dict[str, pd.DataFrame],
+    data: pd.DataFrame,
     pre_crisis_months: int = 6,
     post_crisis_months: int = 6,
-) -> Dict[str, pd.DataFrame]:
+) -> pd.DataFrame:
     """
     Label each date as normal / pre_crisis / crisis / post_crisis.
 
     Parameters
     ----------
-    data : dict
-        Dictionary of DataFrames (same structure as returned by compute_features).
+    data : DataFrame
+        Long-format frame from compute_features (Date index, categorical
+        'ticker' column). Mutated in place: compute_features already
+        returned a fresh frame, so no defensive copy is taken.
     pre_crisis_months : int
         Number of months before each crisis start to label as 'pre_crisis'.
     post_crisis_months : int
@@ -50,72 +110,58 @@ def label_crisis_periods(
 
     Returns
     -------
-    labelled_data : dict
-        Dictionary with the same keys, where each DataFrame includes:
-        - 'regime' column: 'normal', 'pre_crisis', 'crisis', 'post_crisis'
-        - 'crisis_name' column: name of the crisis (or None)
+    labelled_data : DataFrame
+        The same frame with added columns:
+        - 'regime' (Categorical): 'normal', 'pre_crisis', 'crisis', 'post_crisis'
+        - 'crisis_name' (Categorical): name of the crisis (or missing)
         - 'is_crisis' (0/1)
         - 'is_pre_crisis' (0/1)
         - 'is_high_risk' (0/1)  # 1 if pre_crisis or crisis
     """
-
-    labelled_data: Dict[str, pd.DataFrame] = {}
-
-    # Convert crisis dates to Timestamp once
-    crises_parsed = []
-    for c in CRISES:
-        crises_parsed.append(
-            {
-                "name": c["name"],
-                "start": pd.to_datetime(c["start"]),
-                "end": pd.to_datetime(c["end"]),
-            }
-        )
-
-    for name, df in data.items():
-        df = df.copy()
-
-        # Initialise all periods as normal regime
-        df["regime"] = "normal"
-        df["crisis_name"] = None
-        df["is_crisis"] = 0
-        df["is_pre_crisis"] = 0
-        df["is_high_risk"] = 0
-
-        for crisis in crises_parsed:
-            start = crisis["start"]
-            end = crisis["end"]
-
-            # Define pre- and post-crisis windows
-            pre_start = start - pd.DateOffset(months=pre_crisis_months)
-            post_end = end + pd.DateOffset(months=post_crisis_months)
-
-            # Boolean masks
-            crisis_mask = (df.index >= start) & (df.index <= end)
-            pre_mask = (df.index >= pre_start) & (df.index < start)
-            post_mask = (df.index > end) & (df.index <= post_end)
-
-            # Apply labels
-            df.loc[crisis_mask, "regime"] = "crisis"
-            df.loc[crisis_mask, "crisis_name"] = crisis["name"]
-            df.loc[crisis_mask, "is_crisis"] = 1
-
-            df.loc[pre_mask, "regime"] = "pre_crisis"
-            df.loc[pre_mask, "crisis_name"] = crisis["name"]
-            df.loc[pre_mask, "is_pre_crisis"] = 1
-
-            df.loc[post_mask, "regime"] = "post_crisis"
-            df.loc[post_mask, "crisis_name"] = crisis["name"]
-
-        # High risk = pre_crisis OR crisis
-        df["is_high_risk"] = df["is_crisis"] | df["is_pre_crisis"]
-
-        labelled_data[name] = df
-
-        print(
-            f"[OK] {name}: crisis labels assigned "
-            f"(crisis days={df['is_crisis'].sum()}, "
-            f"pre-crisis days={df['is_pre_crisis'].sum()})"
-        )
-
-    return labelled_data
+    df = data
+
+    crises_parsed = _parse_crises(pre_crisis_months, post_crisis_months)
+
+    # Regimes and crisis names are tracked as int8 codes during labelling
+    # (no object-dtype string reallocation) and turned into pandas
+    # Categoricals at the end. Code -1 = no crisis window.
+    n = len(df)
+    regime_codes = np.zeros(n, dtype=np.int8)
+    crisis_name_codes = np.full(n, -1, dtype=np.int8)
+
+    # Everything the kernel touches is int64 nanoseconds
+    ts_ns = df.index.values.astype("datetime64[ns]").view("i8")
+    starts = np.array([c["start"] for c in crises_parsed], dtype="datetime64[ns]").view("i8")
+    ends = np.array([c["end"] for c in crises_parsed], dtype="datetime64[ns]").view("i8")
+    pre_starts = np.array([c["pre_start"] for c in crises_parsed], dtype="datetime64[ns]").view("i8")
+    post_ends = np.array([c["post_end"] for c in crises_parsed], dtype="datetime64[ns]").view("i8")
+
+    # Each ticker occupies a contiguous, date-sorted block of rows, so
+    # every window is a searchsorted slice within the ticker's block.
+    for name, pos in df.groupby("ticker", observed=True, sort=False).indices.items():
+        base = pos[0]
+        _label_kernel(ts_ns[pos], starts, ends, pre_starts, post_ends,
+                      regime_codes, crisis_name_codes, base)
+
+        # Guarded so the counts only run when the message will be emitted
+        if logger.isEnabledFor(logging.INFO):
+            block = regime_codes[pos]
+            logger.info(
+                "[OK] %s: crisis labels assigned (crisis days=%d, pre-crisis days=%d)",
+                name, int((block == 2).sum()), int((block == 1).sum()),
+            )
+
+    df["regime"] = pd.Categorical.from_codes(
+        regime_codes, categories=REGIME_LABELS
+    )
+    df["crisis_name"] = pd.Categorical.from_codes(
+        crisis_name_codes, categories=[c["name"] for c in CRISES]
+    )
+    # The 0/1 indicator columns derive directly from the regime codes
+    df["is_crisis"] = (regime_codes == 2).astype(np.int64)
+    df["is_pre_crisis"] = (regime_codes == 1).astype(np.int64)
+
+    # High risk = pre_crisis OR crisis
+    df["is_high_risk"] = ((regime_codes == 1) | (regime_codes == 2)).astype(np.int64)
+
+    return df
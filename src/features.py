@@ -1,51 +1,210 @@
+import logging
+
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data_loader import DATA_DIR, INDICES, PROJECT_ROOT
+
+# Featured DataFrames are cached here as Parquet between runs
+CACHE_DIR = PROJECT_ROOT / "data" / "cache"
+
+logger = logging.getLogger(__name__)
+
+# numba is the fast path; fall back to numpy + bottleneck if unavailable
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+import bottleneck as bn
+import numexpr as ne
+
+
+def _features_numpy(close, window=30):
+    """
+    Numpy/bottleneck fallback for :func:`_features_kernel`.
+
+    bottleneck's move_std is a C rolling kernel, so this path still
+    avoids the pandas per-column dispatch overhead.
+    """
+    log_close = np.log(close)
+    log_return = np.empty_like(close)
+    log_return[0] = np.nan
+    np.subtract(log_close[1:], log_close[:-1], out=log_return[1:])
+
+    vol = bn.move_std(log_return, window=window, min_count=window, ddof=1)
+
+    # Tight C loop over the contiguous buffer; no block-manager dispatch.
+    # fmax (not maximum) so a NaN Close holds the last peak instead of
+    # poisoning every later row, matching the jitted kernel
+    peak = np.fmax.accumulate(close)
+    # Fused evaluation: one pass, no (close - peak) temporary
+    drawdown = ne.evaluate("(c - p) / p", local_dict={"c": close, "p": peak})
+
+    return log_return, vol, peak, drawdown
+
+
+@njit(cache=True)
+def _features_kernel(close, window=30):
+    """
+    Single-pass kernel computing log returns, rolling volatility,
+    running peak and drawdown from the Close price array.
+
+    Replaces the separate np.log / diff / rolling.std / cummax passes
+    (each of which allocates a full-length array) with one loop that
+    keeps a running sum / sum-of-squares over the last `window` returns.
 
-def compute_features(data: dict) -> dict:
+    NaN returns (e.g. from a coerced bad Close value) are kept out of
+    the accumulator: the window tracks its valid count and emits NaN
+    until it is full again, matching pandas rolling(30).std() and the
+    bn.move_std fallback. No fastmath here — it assumes no NaNs and
+    would compile the isnan checks away.
+    """
+    n = close.shape[0]
+    log_return = np.empty(n)
+    vol = np.empty(n)
+    peak = np.empty(n)
+    drawdown = np.empty(n)
+
+    if n == 0:
+        return log_return, vol, peak, drawdown
+
+    log_return[0] = np.nan
+    vol[0] = np.nan
+    peak_val = close[0]
+    peak[0] = peak_val
+    # 0.0 for a valid first price, NaN if it was coerced to NaN
+    drawdown[0] = (close[0] - peak_val) / peak_val
+
+    ret_sum = 0.0
+    ret_sumsq = 0.0
+    ret_count = 0
+    # Cache log(previous close) so each price is log-transformed only once
+    prev_log = np.log(close[0])
+
+    for i in range(1, n):
+        price = close[i]
+        log_price = np.log(price)
+        lr = log_price - prev_log
+        prev_log = log_price
+        log_return[i] = lr
+
+        # Rolling variance over the last `window` returns; NaNs never
+        # enter the sums, so a bad value cannot poison the state
+        if not np.isnan(lr):
+            ret_sum += lr
+            ret_sumsq += lr * lr
+            ret_count += 1
+        if i > window:
+            old = log_return[i - window]
+            if not np.isnan(old):
+                ret_sum -= old
+                ret_sumsq -= old * old
+                ret_count -= 1
+        if ret_count == window:
+            var = (ret_sumsq - ret_sum * ret_sum / window) / (window - 1)
+            vol[i] = np.sqrt(var) if var > 0.0 else 0.0
+        else:
+            vol[i] = np.nan
+
+        # Running peak and drawdown: a NaN price holds the last peak,
+        # and a NaN peak (leading NaNs) is replaced by the first price
+        if price > peak_val or (np.isnan(peak_val) and not np.isnan(price)):
+            peak_val = price
+        peak[i] = peak_val
+        drawdown[i] = (price - peak_val) / peak_val
+
+    return log_return, vol, peak, drawdown
+
+
+def compute_features(data: pd.DataFrame) -> pd.DataFrame:
     """
     Compute log-returns, rolling volatility and drawdown for all indices.
 
     Parameters
     ----------
-    data : dict
-        Dictionary where each key = index name (e.g. 'SP500'),
-        and each value = DataFrame with at least a 'Close' price column.
+    data : DataFrame
+        Long-format frame from load_indices: Date index, a 'Close'
+        column and a categorical 'ticker' column.
 
     Returns
     -------
-    features : dict
-        Dictionary with the same keys, each containing a DataFrame
-        enriched with:
+    features : DataFrame
+        The same rows enriched with:
         - log_return
         - vol_30d
+        - peak
         - drawdown
+        computed per ticker.
     """
+    # Keep only the columns used downstream: the other OHLCV columns
+    # would double peak memory for nothing.
+    df = data[["Close", "ticker"]].copy(deep=False)
 
-    features = {}
+    # Ensure Close column is numeric
+    df["Close"] = pd.to_numeric(df["Close"], errors="coerce")
 
-    for name, df in data.items():
+    close = df["Close"].to_numpy()
+    n = len(df)
 
-        df = df.copy()
+    # float32 is plenty for plots and 4-digit summary statistics, and
+    # halves the bytes every downstream operation has to move
+    log_return = np.empty(n, dtype=np.float32)
+    vol = np.empty(n, dtype=np.float32)
+    peak = np.empty(n, dtype=np.float32)
+    drawdown = np.empty(n, dtype=np.float32)
 
-        # Ensure Close column is numeric
-        df["Close"] = pd.to_numeric(df["Close"], errors="coerce")
+    kernel = _features_kernel if HAVE_NUMBA else _features_numpy
+    for name, pos in df.groupby("ticker", observed=True, sort=False).indices.items():
+        log_return[pos], vol[pos], peak[pos], drawdown[pos] = kernel(close[pos])
 
-        # Compute log returns
-        df["log_return"] = np.log(df["Close"]).diff()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[OK] %s: features computed (null log_returns=%d)",
+                        name, int(np.isnan(log_return[pos]).sum()))
 
-        # Rolling 30-day volatility
-        df["vol_30d"] = df["log_return"].rolling(window=30).std()
+    df["log_return"] = log_return
+    df["vol_30d"] = vol
+    df["peak"] = peak
+    df["drawdown"] = drawdown
 
-        # Compute running max (peak)
-        df["peak"] = df["Close"].cummax()
+    return df
 
-        # Drawdown = (price - peak) / peak
-        df["drawdown"] = (df["Close"] - df["peak"]) / df["peak"]
 
-        # Store result
-        features[name] = df
+def load_or_compute(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return the featured frame, using a Parquet cache when possible.
+
+    The cached parquet in data/cache is reused if it is newer than every
+    raw CSV; otherwise features are recomputed and the cache refreshed.
+    Parquet reads are columnar and much faster than re-parsing CSV plus
+    recomputing every run.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Output of load_indices (long-format frame).
+
+    Returns
+    -------
+    features : DataFrame
+        Same structure as compute_features.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path = CACHE_DIR / "features.parquet"
 
-        print(f"[OK] {name}: features computed "
-              f"(null log_returns={df['log_return'].isna().sum()})")
+    newest_csv = max(
+        (DATA_DIR / f"{name}.csv").stat().st_mtime for name in INDICES
+    )
+    if cache_path.exists() and cache_path.stat().st_mtime >= newest_csv:
+        logger.info("[OK] features loaded from cache (%s)", cache_path)
+        return pq.read_table(cache_path).to_pandas()
 
+    features = compute_features(data)
+    pq.write_table(pa.Table.from_pandas(features), cache_path)
     return features